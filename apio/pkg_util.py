@@ -9,11 +9,15 @@
 # ---- Licence Apache v2
 """Utility functions related to apio packages."""
 
-from typing import List, Callable, Tuple, Optional
+from typing import List, Dict, Set, Callable, Tuple, Optional
 from pathlib import Path
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 import os
+import re
 import sys
+import weakref
 import click
 import semantic_version
 from apio.apio_context import ApioContext
@@ -25,9 +29,9 @@ class EnvMutations:
     """Contains mutations to the system env."""
 
     # -- PATH items to add.
-    paths: List[str]
+    paths: Tuple[str, ...]
     # -- Vars name/value paris.
-    vars: List[Tuple[str, str]]
+    vars: Tuple[Tuple[str, str], ...]
 
 
 @dataclass(frozen=True)
@@ -42,27 +46,50 @@ class _PackageDesc:
     env_func: Callable[[Path], EnvMutations]
 
 
+# -- A cache of the env mutations of each apio context. The packages of
+# -- a context don't change after it's created so we compute the mutations
+# -- only once. Weak keys so we don't keep discarded contexts alive.
+_MUTATIONS_CACHE: "weakref.WeakKeyDictionary[ApioContext, EnvMutations]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
 def _get_env_mutations_for_packages(apio_ctx: ApioContext) -> EnvMutations:
     """Collects the env mutation for each of the defined packages,
-    in the order they are defined."""
+    in the order they are defined. The result is cached per apio context."""
+
+    mutations = _MUTATIONS_CACHE.get(apio_ctx)
+    if mutations is None:
+        mutations = _collect_env_mutations_for_packages(apio_ctx)
+        _MUTATIONS_CACHE[apio_ctx] = mutations
+    return mutations
+
+
+def _collect_env_mutations_for_packages(
+    apio_ctx: ApioContext,
+) -> EnvMutations:
+    """The uncached implementation of _get_env_mutations_for_packages()."""
 
-    result = EnvMutations([], [])
-    for _, package_config in apio_ctx.platform_packages.items():
+    paths: List[str] = []
+    vars_: List[Tuple[str, str]] = []
+    for package_name, package_config in apio_ctx.platform_packages.items():
         # -- Get the json 'env' section. We require it, even if it's empty,
         # -- for clarity reasons.
-        assert "env" in package_config
-        package_env = package_config["env"]
+        package_env = package_config.get("env")
+        if package_env is None:
+            raise RuntimeError(
+                f"Package [{package_name}] has no 'env' section"
+            )
 
         # -- Collect the path values.
         path_list = package_env.get("path", [])
-        result.paths.extend(path_list)
+        paths.extend(path_list)
 
         # -- Collect the env vars (name, value) pairs.
         vars_section = package_env.get("vars", {})
-        for var_name, var_value in vars_section.items():
-            result.vars.append((var_name, var_value))
+        vars_.extend(vars_section.items())
 
-    return result
+    return EnvMutations(tuple(paths), tuple(vars_))
 
 
 def _dump_env_mutations(
@@ -70,24 +97,33 @@ def _dump_env_mutations(
 ) -> None:
     """For debugging. Delete once stabalizing the new oss-cad-suite on
     windows."""
-    click.secho("Envirnment settings:", fg="magenta")
+    # -- We collect the lines and print them at once.
+    lines = [click.style("Envirnment settings:", fg="magenta")]
+
+    # -- Select the platform specific formats.
+    if apio_ctx.is_windows():
+        path_fmt = "set {n}={v};%PATH%"
+        var_fmt = "set {n}={v}"
+    else:
+        path_fmt = '{n}="{v}:$PATH"'
+        var_fmt = '{n}="{v}"'
 
     # -- Print PATH mutations.
-    windows = apio_ctx.is_windows()
-    for p in reversed(mutations.paths):
-        styled_name = click.style("PATH", fg="magenta")
-        if windows:
-            click.secho(f"set {styled_name}={p};%PATH%")
-        else:
-            click.secho(f'{styled_name}="{p}:$PATH"')
+    styled_path = click.style("PATH", fg="magenta")
+    for p in mutations.paths[::-1]:
+        lines.append(path_fmt.format(n=styled_path, v=p))
 
-    # -- Print vars mutations.
+    # -- Print vars mutations. Var names may repeat so we style each name
+    # -- only once.
+    styled_names: Dict[str, str] = {}
     for name, val in mutations.vars:
-        styled_name = click.style(name, fg="magenta")
-        if windows:
-            click.secho(f"set {styled_name}={val}")
-        else:
-            click.secho(f'{styled_name}="{val}"')
+        styled_name = styled_names.get(name)
+        if styled_name is None:
+            styled_name = click.style(name, fg="magenta")
+            styled_names[name] = styled_name
+        lines.append(var_fmt.format(n=styled_name, v=val))
+
+    click.secho("\n".join(lines))
 
 
 def _apply_env_mutations(mutations: EnvMutations) -> None:
@@ -95,13 +131,12 @@ def _apply_env_mutations(mutations: EnvMutations) -> None:
 
     # -- Apply the path mutations, while preserving order.
     old_val = os.environ["PATH"]
-    items = mutations.paths + [old_val]
-    new_val = os.pathsep.join(items)
+    new_val = os.pathsep.join(chain(mutations.paths, (old_val,)))
     os.environ["PATH"] = new_val
 
-    # -- Apply the vars mutations, while preserving order.
-    for name, value in mutations.vars:
-        os.environ[name] = value
+    # -- Apply the vars mutations, while preserving order. If a var is
+    # -- set more than once, the last value wins.
+    os.environ.update(dict(mutations.vars))
 
 
 # -- A static flag that is used to make sure we set the env only once.
@@ -118,6 +153,11 @@ def set_env_for_packages(apio_ctx: ApioContext, verbose: bool = False) -> None:
     skips the operation silently.
     """
 
+    # -- Nothing to do if the env was already set and we don't need to
+    # -- dump it.
+    if apio_ctx.env_was_already_set and not verbose:
+        return
+
     # -- Collect the env mutations for all packages.
     mutations = _get_env_mutations_for_packages(apio_ctx)
 
@@ -147,23 +187,24 @@ def check_required_packages(
 
     installed_packages = apio_ctx.profile.packages
     spec_packages = apio_ctx.distribution.get("packages")
+    all_packages = apio_ctx.all_packages
+    platform_packages = apio_ctx.platform_packages
 
     # -- Check packages
     for package_name in required_packages_names:
         # -- Package name must be in all_packages. Otherwise it's a programming
         # -- error.
-        if package_name not in apio_ctx.all_packages:
+        if package_name not in all_packages:
             raise RuntimeError(f"Unknown package named [{package_name}]")
 
         # -- Skip if packages is not applicable to this platform.
-        if package_name not in apio_ctx.platform_packages:
+        if package_name not in platform_packages:
             continue
 
         # -- The package is applicable to this platform. Check installed
         # -- version, if at all.
-        current_version = installed_packages.get(package_name, {}).get(
-            "version", None
-        )
+        package_info = installed_packages.get(package_name)
+        current_version = package_info.get("version") if package_info else None
 
         # -- Check the installed version against the required version.
         spec_version = spec_packages.get(package_name, "")
@@ -211,7 +252,7 @@ def _check_required_package(
 
     # -- Case 3: The package's directory does not exist.
     package_dir = apio_ctx.get_package_dir(package_name)
-    if package_dir and not package_dir.is_dir():
+    if package_dir and not _is_package_dir(apio_ctx, package_dir):
         message = f"Error: package '{package_name}' is installed but missing"
         click.secho(message, fg="red")
         click.secho(
@@ -224,6 +265,40 @@ def _check_required_package(
         sys.exit(1)
 
 
+# -- A cache of the package directories that were found to exist, per apio
+# -- context. Packages are not uninstalled while a context is in use so we
+# -- stat each package dir only once. A missing dir is a fatal error and is
+# -- not cached.
+_PACKAGE_DIRS_CACHE: "weakref.WeakKeyDictionary[ApioContext, Set[str]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _is_package_dir(apio_ctx: ApioContext, package_dir: Path) -> bool:
+    """Returns True if the given package dir exists and is a directory."""
+    known_dirs = _PACKAGE_DIRS_CACHE.setdefault(apio_ctx, set())
+    key = str(package_dir)
+    if key in known_dirs:
+        return True
+    if not package_dir.is_dir():
+        return False
+    known_dirs.add(key)
+    return True
+
+
+# -- Simple specs and versions that can be matched without the full
+# -- semantic version parser. E.g. '>=0.2.1' and '0.2.3'. Leading zeros
+# -- are excluded since they are not valid semantic versions. The patterns
+# -- are compiled once, at import time, so the matching path only calls
+# -- match().
+_SIMPLE_SPEC_RE: "re.Pattern[str]" = re.compile(
+    r"^(==|>=|<=|~|\^)?(0|[1-9]\d*)\.(0|[1-9]\d*)\.(0|[1-9]\d*)$"
+)
+_SIMPLE_VER_RE: "re.Pattern[str]" = re.compile(
+    r"^(0|[1-9]\d*)\.(0|[1-9]\d*)\.(0|[1-9]\d*)$"
+)
+
+
 def _version_matches(current_version: str, spec_version: str) -> bool:
     """Tests if a given version satisfy the semantic version constraints
     * INPUTS:
@@ -234,12 +309,101 @@ def _version_matches(current_version: str, spec_version: str) -> bool:
       - False: Version not ok! or incorrect version number
     """
 
+    # -- Try first the fast path for the simple and common cases.
+    result = _simple_version_matches(current_version, spec_version)
+    if result is not None:
+        return result
+
+    # -- Fall back to the full semantic version parser.
+    return _cached_version_matches(current_version, spec_version)
+
+
+# pylint: disable=too-many-return-statements
+def _simple_version_matches(
+    current_version: str, spec_version: str
+) -> Optional[bool]:
+    """A fast path of _version_matches() for the simple cases of a single
+    spec clause and a plain 'X.Y.Z' version. Returns the match result, or
+    None if the spec or the version are not simple and the full semantic
+    version parser should be used instead.
+    """
+    spec_match = _SIMPLE_SPEC_RE.match(spec_version)
+    if not spec_match:
+        return None
+
+    ver_match = _SIMPLE_VER_RE.match(current_version)
+    if not ver_match:
+        return None
+
+    op = spec_match.group(1)
+    major, minor, patch = (int(x) for x in spec_match.group(2, 3, 4))
+    target = (major, minor, patch)
+    current = tuple(int(x) for x in ver_match.groups())
+
+    # -- No operator is the same as '=='.
+    if op in (None, "=="):
+        return current == target
+
+    if op == ">=":
+        return current >= target
+
+    if op == "<=":
+        return current <= target
+
+    # -- Tilde, accepts higher patches of the same minor.
+    if op == "~":
+        return target <= current < (major, minor + 1, 0)
+
+    # -- Caret, accepts anything with the same most significant non zero
+    # -- number.
+    assert op == "^", op
+    if major:
+        high = (major + 1, 0, 0)
+    elif minor:
+        high = (0, minor + 1, 0)
+    else:
+        high = (0, 0, patch + 1)
+    return target <= current < high
+
+
+# -- Caches of parsed semantic version objects, keyed by their string
+# -- representation. The spec strings come from distribution.json and are
+# -- static, so each one is parsed once per apio invocation.
+_SPEC_CACHE: Dict[str, semantic_version.SimpleSpec] = {}
+_VERSION_CACHE: Dict[str, semantic_version.Version] = {}
+
+
+def _get_spec(spec_version: str) -> semantic_version.SimpleSpec:
+    """Returns the parsed SimpleSpec of the given spec string."""
+    spec = _SPEC_CACHE.get(spec_version)
+    if spec is None:
+        spec = semantic_version.SimpleSpec(spec_version)
+        _SPEC_CACHE[spec_version] = spec
+    return spec
+
+
+def _get_version(current_version: str) -> semantic_version.Version:
+    """Returns the parsed Version of the given version string. Raises
+    ValueError if the version string is invalid."""
+    semver = _VERSION_CACHE.get(current_version)
+    if semver is None:
+        semver = semantic_version.Version(current_version)
+        _VERSION_CACHE[current_version] = semver
+    return semver
+
+
+# -- The same (version, spec) pairs are checked again and again, so we
+# -- parse each pair only once. Results, including False, are cached.
+@lru_cache(maxsize=256)
+def _cached_version_matches(current_version: str, spec_version: str) -> bool:
+    """The cached implementation of _version_matches()."""
+
     # -- Build a semantic version object
-    spec = semantic_version.SimpleSpec(spec_version)
+    spec = _get_spec(spec_version)
 
     # -- Check it!
     try:
-        semver = semantic_version.Version(current_version)
+        semver = _get_version(current_version)
 
     # -- Incorrect version number
     except ValueError:
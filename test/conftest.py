@@ -58,7 +58,6 @@ class ApioSandbox:
         self._apio_runner = apio_runner_
         self._proj_dir = proj_dir
         self._home_dir = home_dir
-        self._click_runner = CliRunner()
 
     @property
     def expired(self) -> bool:
@@ -119,7 +118,7 @@ class ApioSandbox:
         assert os.environ["APIO_HOME_DIR"] == str(self.home_dir)
 
         # -- Invoke the command. Get back the collected results.
-        result = self._click_runner.invoke(
+        result = self._apio_runner.click_runner.invoke(
             cli=cli,
             args=args,
             input=input,
@@ -258,10 +257,12 @@ class ApioRunner:
     """
 
     def __init__(self, request):
-        # -- A CliRunner instance that is used for creating temp directories
-        # -- and to invoke apio commands.
         self._request = request
 
+        # -- A CliRunner instance that is used to invoke apio commands. It
+        # -- doesn't hold per test state so it's shared by all the sandboxes.
+        self._click_runner = CliRunner()
+
         # -- Indicate that we are not in a sandbox
         self._sandbox: ApioSandbox = None
 
@@ -270,6 +271,11 @@ class ApioRunner:
         """Returns the sandbox object or None if not in a sandbox."""
         return self._sandbox
 
+    @property
+    def click_runner(self) -> CliRunner:
+        """Returns the shared CliRunner."""
+        return self._click_runner
+
     @contextlib.contextmanager
     def in_sandbox(self):
         """Create an apio sandbox context manager that delete the temp dir
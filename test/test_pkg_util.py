@@ -0,0 +1,47 @@
+"""
+Tests of pkg_util.py
+"""
+
+import semantic_version
+from apio.pkg_util import _version_matches, _simple_version_matches
+
+
+def test_version_matches():
+    """Tests the _version_matches() function."""
+
+    assert _version_matches("0.2.1", ">=0.2.1")
+    assert _version_matches("1.0.0", ">=0.2.1")
+    assert not _version_matches("0.2.0", ">=0.2.1")
+
+    # -- Specs that are not handled by the fast path.
+    assert _version_matches("0.2.5", ">=0.2.1,<0.3.0")
+    assert not _version_matches("0.3.0", ">=0.2.1,<0.3.0")
+    assert _version_matches("0.12.1", ">=0.12")
+
+    # -- Invalid versions are not matched.
+    assert not _version_matches("bad", ">=0.2.1")
+    assert not _version_matches("01.2.3", ">=0.2.1")
+
+
+def test_simple_version_matches():
+    """Tests that the fast path of _version_matches() agrees with the
+    semantic_version package."""
+
+    # -- Not handled by the fast path.
+    assert _simple_version_matches("0.2.1", ">=0.2") is None
+    assert _simple_version_matches("0.2.1", ">0.2.1") is None
+    assert _simple_version_matches("0.2.1-rc1", ">=0.2.1") is None
+    assert _simple_version_matches("0.2.1", "~=0.2.1") is None
+
+    versions = ["0.0.0", "0.0.1", "0.0.2", "0.1.0", "0.1.3", "0.2.0"]
+    versions += ["1.0.0", "1.2.3", "1.2.9", "1.3.0", "2.0.0", "10.0.0"]
+    for op in ["", "==", ">=", "<=", "~", "^"]:
+        for target in versions:
+            spec = op + target
+            for current in versions:
+                expected = semantic_version.Version(
+                    current
+                ) in semantic_version.SimpleSpec(spec)
+                assert (
+                    _simple_version_matches(current, spec) == expected
+                ), f"{current} {spec}"